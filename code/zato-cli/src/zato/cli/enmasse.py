@@ -36,6 +36,11 @@ if typing.TYPE_CHECKING:
 DEFAULT_COLS_WIDTH = '15,100'
 ZATO_NO_SECURITY = 'zato-no-security'
 
+# How many get-list requests may be in flight at once when objects are refreshed. All of them share the client's
+# requests.Session whose default HTTPAdapter keeps up to 10 connections (requests.adapters.DEFAULT_POOLSIZE),
+# so more threads than that would only make urllib3 discard the extra connections.
+REFRESH_MAX_WORKERS = 10
+
 Code = namedtuple('Code', ('symbol', 'desc'))
 
 WARNING_ALREADY_EXISTS_IN_ODB = Code('W01', 'already exists in ODB')
@@ -54,12 +59,6 @@ ERROR_MISSING_DEP = Code('E13', 'dependency missing')
 ERROR_COULD_NOT_IMPORT_OBJECT = Code('E13', 'could not import object')
 ERROR_TYPE_MISSING = Code('E04', 'type missing')
 
-def find_first(it, pred):
-    """Given any iterable, return the first element `elem` from it matching `pred(elem)`"""
-    for obj in it:
-        if pred(obj):
-            return obj
-
 def dict_match(haystack, needle):
     """Return True if all the keys from `needle` appear in `haystack` with the same value.
     """
@@ -127,6 +126,12 @@ def populate_services_from_apispec(client, logger):
             SERVICES.append(service_info)
 
         service_info.methods = methods
+        service_info._required_keys = None
+
+    SERVICE_NAMES_SORTED[:] = sorted(SERVICE_BY_NAME)
+    SECURITY_SERVICES[:] = [service_info for service_info in SERVICES if service_info.is_security]
+    SECURITY_SERVICE_NAMES.clear()
+    SECURITY_SERVICE_NAMES.update(service_info.name for service_info in SECURITY_SERVICES)
 
 # The common prefix for a set of services is tested against the first element in this list using startswith().
 # If it matches, that prefix is replaced by the second element. The prefixes must match exactly if the first element
@@ -150,21 +155,46 @@ SHORTNAME_BY_PREFIX = [
     ('zato.channel.', ''),
 ]
 
+def _get_prefix_component(prefix):
+    """ Return the first component of a prefix after the leading 'zato.', e.g. 'security' for 'zato.security.basic-auth'.
+    """
+    return prefix.partition('.')[2].partition('.')[0]
+
+def _build_shortname_dispatch():
+    """ Split SHORTNAME_BY_PREFIX into a dict of prefixes that must match exactly and lists of prefixes matched
+    using startswith(), keyed by their first component. The latter lists keep the order from SHORTNAME_BY_PREFIX.
+    """
+    exact = {}
+    by_component = {}
+
+    for module_prefix, name_prefix in SHORTNAME_BY_PREFIX:
+        if module_prefix.endswith('.'):
+            by_component.setdefault(_get_prefix_component(module_prefix), []).append((module_prefix, name_prefix))
+        else:
+            exact.setdefault(module_prefix, name_prefix)
+
+    return exact, by_component
+
+
+SHORTNAME_BY_EXACT_PREFIX, SHORTNAME_BY_PREFIX_COMPONENT = _build_shortname_dispatch()
+
+# Meant for unicode input (str under Python 3) - unicode.translate accepts such a dict but Python 2 str.translate
+# requires a 256-character table instead. Service names from apispec are always unicode.
+SERVICE_NAME_ESCAPE_TABLE = {ord('.'): '_', ord('-'): '_'}
 
 def make_service_name(prefix):
 
-    # stdlib
-    import re
+    name_prefix = SHORTNAME_BY_EXACT_PREFIX.get(prefix)
+    if name_prefix is not None:
+        return name_prefix
 
-    escaped = re.sub('[.-]', '_', prefix)
-    for module_prefix, name_prefix in SHORTNAME_BY_PREFIX:
-        if prefix.startswith(module_prefix) and module_prefix.endswith('.'):
+    escaped = prefix.translate(SERVICE_NAME_ESCAPE_TABLE)
+    for module_prefix, name_prefix in SHORTNAME_BY_PREFIX_COMPONENT.get(_get_prefix_component(prefix), ()):
+        if prefix.startswith(module_prefix):
             name = escaped[len(module_prefix):]
             if name_prefix:
                 name = '{}_{}'.format(name_prefix, name)
             return name
-        elif prefix == module_prefix:
-            return name_prefix
     return escaped
 
 def normalize_service_name(item):
@@ -175,6 +205,16 @@ def normalize_service_name(item):
         item.setdefault('service', item.get('service_name'))
         item.setdefault('service_name', item.get('service'))
 
+def get_flat_items(json):
+    """ Given input JSON mapping item types to lists of items, return a list of (item_type, item) tuples for all the items.
+    Items of the same type are next to each other in the output list.
+    """
+
+    # Python 2/3 compatibility
+    from future.utils import iteritems
+
+    return [(item_type, item) for item_type, items in iteritems(json) for item in items]
+
 def test_item(item, cond):
     """ Given a dictionary `cond` containing some conditions to test an item for, return True if those conditions match.
     Currently only supports testing whether a field has a particular value. Returns ``True`` if `cond` is ``None``."""
@@ -188,12 +228,18 @@ def test_item(item, cond):
     return True
 
 class ServiceInfo(object):
+    __slots__ = ('name', 'is_def', 'prefix', 'methods', 'object_dependencies', 'service_dependencies', 'export_filter',
+        '_required_keys')
+
     def __init__(self, prefix=None, name=None, object_dependencies=None, service_dependencies=None, export_filter=None):
         assert name or prefix
 
         # Short service name as appears in export data.
         self.name = name or prefix
 
+        # Whether this is a definition, e.g. def_amqp, that other objects may refer to.
+        self.is_def = self.name.startswith('def_')
+
         # Optional name of the object enumeration/retrieval service.
         self.prefix = prefix
 
@@ -214,6 +260,9 @@ class ServiceInfo(object):
         # field_name: value
         self.export_filter = export_filter or {}
 
+        # Cached output of get_required_keys(), reset whenever self.methods changes.
+        self._required_keys = None
+
 # ################################################################################################################################
 
     @property
@@ -232,13 +281,18 @@ class ServiceInfo(object):
     def get_required_keys(self):
         """ Return the set of keys required to create a new instance.
         """
+        if self._required_keys is not None:
+            return self._required_keys
+
         method_sig = self.methods.get('create')
         if method_sig is None:
-            return set()
+            required = frozenset()
+        else:
+            input_required = method_sig['simple_io']['zato']['input_required']
+            required = frozenset(f['name'] for f in input_required if f['name'] != 'cluster_id')
 
-        input_required = method_sig['simple_io']['zato']['input_required']
-        required = set(f['name'] for f in input_required)
-        required.discard('cluster_id')
+        # Immutable because the same object is handed out to all callers
+        self._required_keys = required
         return required
 
 # ################################################################################################################################
@@ -405,6 +459,13 @@ SERVICES = [
 SERVICE_BY_NAME = {info.name: info for info in SERVICES}
 SERVICE_BY_PREFIX = {info.prefix: info for info in SERVICES}
 
+# Kept up to date by populate_services_from_apispec() and used in error messages.
+SERVICE_NAMES_SORTED = sorted(SERVICE_BY_NAME)
+
+# Security definitions' types, also kept up to date by populate_services_from_apispec().
+SECURITY_SERVICES = [info for info in SERVICES if info.is_security]
+SECURITY_SERVICE_NAMES = {info.name for info in SECURITY_SERVICES}
+
 HTTP_SOAP_KINDS = (
     # item_type             connection      transport
     ('channel_soap',        'channel',      'soap'),
@@ -413,6 +474,10 @@ HTTP_SOAP_KINDS = (
     ('outconn_plain_http',  'outgoing',     'plain_http')
 )
 HTTP_SOAP_ITEM_TYPES = set(tup[0] for tup in HTTP_SOAP_KINDS)
+HTTP_SOAP_CONNECTION_TRANSPORT = {tup[0]: tup[1:] for tup in HTTP_SOAP_KINDS}
+
+# All the keys under which http-soap objects may be found, in the old format or already merged into one.
+HTTP_SOAP_KEYS = frozenset(HTTP_SOAP_ITEM_TYPES | {'http_soap'})
 
 class _DummyLink(object):
     """ Pip requires URLs to have a .url attribute.
@@ -421,6 +486,8 @@ class _DummyLink(object):
         self.url = url
 
 class Notice(object):
+    __slots__ = ('value_raw', 'value', 'code')
+
     def __init__(self, value_raw, value, code):
         self.value_raw = value_raw
         self.value = value
@@ -434,6 +501,8 @@ class Notice(object):
             self.value, self.code)
 
 class Results(object):
+    __slots__ = ('warnings', 'errors', 'service_name')
+
     def __init__(self, warnings=None, errors=None, service=None):
 
         # List of Warning instances
@@ -465,23 +534,21 @@ class Results(object):
         return not (self.warnings or self.errors)
 
 class InputValidator(object):
-    def __init__(self, json):
+    def __init__(self, json, flat_items=None):
         #: Validation result.
         self.results = Results()
         #: Input JSON to validate.
         self.json = json
+        #: The same input as returned by get_flat_items, unless the caller already has it.
+        self.flat_items = get_flat_items(json) if flat_items is None else flat_items
 
 # ################################################################################################################################
 
     def validate(self):
         # type: () -> Results
 
-        # Python 2/3 compatibility
-        from future.utils import iteritems
-
-        for item_type, items in iteritems(self.json):
-            for item in items:
-                self.validate_one(item_type, item)
+        for item_type, item in self.flat_items:
+            self.validate_one(item_type, item)
 
         return self.results
 
@@ -489,60 +556,120 @@ class InputValidator(object):
 
     def validate_one(self, item_type, item):
         if item_type not in SERVICE_BY_NAME:
-            raw = (item_type, sorted(SERVICE_BY_NAME))
-            self.results.add_error(raw, ERROR_INVALID_KEY, "Invalid key '{}', must be one of '{}'", item_type, sorted(SERVICE_BY_NAME))
+            raw = (item_type, SERVICE_NAMES_SORTED)
+            self.results.add_error(raw, ERROR_INVALID_KEY, "Invalid key '{}', must be one of '{}'", item_type, SERVICE_NAMES_SORTED)
             return
 
-        item_dict = dict(item)
         service_info = SERVICE_BY_NAME[item_type]
         required_keys = service_info.get_required_keys()
         # OK, the keys are there, but do they all have non-None values?
         for req_key in required_keys:
             if item.get(req_key) is None: # 0 or '' can be correct values
+                item_dict = dict(item)
                 raw = (req_key, required_keys, item_dict, item_type)
                 self.results.add_error(raw, ERROR_KEYS_MISSING, "Key '{}' must exist in {}: {}", req_key, item_type, item_dict)
 
 class DependencyScanner(object):
-    def __init__(self, json, ignore_missing=False):
+    def __init__(self, json, ignore_missing=False, flat_items=None):
         self.json = json
+        #: The same input as returned by get_flat_items, unless the caller already has it.
+        self.flat_items = get_flat_items(json) if flat_items is None else flat_items
         self.ignore_missing = ignore_missing
         #: (item_type, name): [(item_type, name), ..]
         self.missing = {}
+        #: (item_type, field, value): item
+        self.by_type_field = {}
+        #: Fields that self.by_type_field covers
+        self.indexed_fields = set()
+
+        self.build_index()
+
+# ################################################################################################################################
+
+    def build_index(self):
+        """ Indexes all the input items by each field that other items may depend on so that find can avoid linear scans.
+        """
+
+        # Python 2/3 compatibility
+        from future.utils import itervalues
+
+        fields = self.indexed_fields
+        for service_info in SERVICES:
+            for dep_info in itervalues(service_info.object_dependencies):
+                fields.add(dep_info['dependent_field'])
+
+        for item_type, item in self.flat_items:
+
+            # Security definitions are looked up through their actual types, as in find_sec
+            if item_type == 'def_sec':
+                continue
+
+            for field in fields:
+                self.by_type_field.setdefault((item_type, field, item.get(field)), item)
+
+        for service_info in SECURITY_SERVICES:
+            for item in self.json.get(service_info.name, ()):
+                for field in fields:
+                    self.by_type_field.setdefault(('def_sec', field, item.get(field)), item)
 
 # ################################################################################################################################
 
     def find(self, item_type, fields):
+
+        # Python 2/3 compatibility
+        from future.utils import iteritems
+
+        if len(fields) == 1:
+            field, value = list(iteritems(fields))[0]
+            if field in self.indexed_fields:
+                return self.by_type_field.get((item_type, field, value))
+
         if item_type == 'def_sec':
             return self.find_sec(fields)
         lst = self.json.get(item_type, ())
-        return find_first(lst, lambda item: dict_match(item, fields))
+        return next((item for item in lst if dict_match(item, fields)), None)
 
 # ################################################################################################################################
 
     def find_sec(self, fields):
-        for service in SERVICES:
-            if service.is_security:
-                item = self.find(service.name, fields)
-                if item is not None:
-                    return item
+        for service in SECURITY_SERVICES:
+            item = self.find(service.name, fields)
+            if item is not None:
+                return item
 
 # ################################################################################################################################
 
-    def scan_item(self, item_type, item, results):
-        """ Scan the data of a single item for required dependencies, recording any that are missing in self.missing.
+    def get_dependencies(self, item_type):
+        """ Return a tuple of (dep_key, dep_info, condition, empty_value, dependent_type, dependent_field) tuples,
+        one for each object dependency of `item_type`.
         """
-        # type: (str, dict, Results)
 
         # Python 2/3 compatibility
         from future.utils import iteritems
 
         service_info = SERVICE_BY_NAME[item_type] # type: ServiceInfo
 
-        for dep_key, dep_info in iteritems(service_info.object_dependencies):
-            if not test_item(item, dep_info.get('condition')):
-                continue
+        return tuple(
+            (dep_key, dep_info, dep_info.get('condition'), dep_info.get('empty_value'),
+                dep_info['dependent_type'], dep_info['dependent_field'])
+            for dep_key, dep_info in iteritems(service_info.object_dependencies))
 
-            if item.get('security_id') == 'ZATO_SEC_USE_RBAC':
+# ################################################################################################################################
+
+    def scan_item(self, item_type, item, results, dependencies=None):
+        """ Scan the data of a single item for required dependencies, recording any that are missing in self.missing.
+        The item's dependencies, as returned by get_dependencies, may be given on input if they are already known.
+        """
+        # type: (str, dict, Results, tuple)
+
+        if item.get('security_id') == 'ZATO_SEC_USE_RBAC':
+            return
+
+        if dependencies is None:
+            dependencies = self.get_dependencies(item_type)
+
+        for dep_key, dep_info, condition, empty_value, dependent_type, dependent_field in dependencies:
+            if not test_item(item, condition):
                 continue
 
             if dep_key not in item:
@@ -550,11 +677,11 @@ class DependencyScanner(object):
                     (dep_key, dep_info), ERROR_MISSING_DEP, "{} lacks required {} field: {}", item_type, dep_key, item)
 
             value = item.get(dep_key)
-            if value != dep_info.get('empty_value'):
+            if value != empty_value:
 
-                dep = self.find(dep_info['dependent_type'], {dep_info['dependent_field']: value})
+                dep = self.find(dependent_type, {dependent_field: value})
                 if dep is None:
-                    key = (dep_info['dependent_type'], item[dep_key])
+                    key = (dependent_type, item[dep_key])
                     names = self.missing.setdefault(key, [])
                     names.append(item.name)
 
@@ -567,13 +694,23 @@ class DependencyScanner(object):
         from future.utils import iteritems
 
         results = Results()
+
+        # Dependencies are the same for all items of a given type so they are looked up once per type
         for item_type, items in iteritems(self.json):
-            for item in items:
-                self.scan_item(item_type, item, results)
+            if items:
+                dependencies = self.get_dependencies(item_type)
+                for item in items:
+                    self.scan_item(item_type, item, results, dependencies)
 
         if not self.ignore_missing:
+
+            # missing_type -> sorted names of all the input items of that type
+            existing_by_type = {}
+
             for (missing_type, missing_name), dep_names in sorted(iteritems(self.missing)):
-                existing = sorted(item.name for item in self.json.get(missing_type, []))
+                existing = existing_by_type.get(missing_type)
+                if existing is None:
+                    existing = existing_by_type[missing_type] = sorted(item.name for item in self.json.get(missing_type, []))
                 raw = (missing_type, missing_name, dep_names, existing)
                 results.add_warning(
                     raw, WARNING_MISSING_DEF, "'{}' is needed by '{}' but was not among '{}'",
@@ -586,7 +723,10 @@ class ObjectImporter(object):
         # type: (APIClient, Logger, ObjectManager, dict, bool, object)
 
         # Bunch
-        from bunch import bunchify
+        from bunch import Bunch
+
+        # Python 2/3 compatibility
+        from future.utils import iteritems
 
         # Zato client.
         self.client = client
@@ -599,14 +739,33 @@ class ObjectImporter(object):
         # ObjectManager instance.
         self.object_mgr = object_mgr
 
-        # JSON to import.
-        self.json = bunchify(json)
+        # JSON to import. InputParser already stores each item as a Bunch so only the lists are copied,
+        # which lets remove_from_import_list modify them without affecting the caller's data.
+        self.json = {}
+
+        # (item_type, name) -> items from self.json of that type and name, in input order.
+        self.json_by_name = {}
+
+        for item_type, items in iteritems(json):
+            self.json[item_type] = [item if isinstance(item, Bunch) else Bunch(item) for item in items]
+            for item in self.json[item_type]:
+                self.json_by_name.setdefault((item_type, item.get('name')), []).append(item)
+
+        # All the items to import, as returned by get_flat_items, for use by the validation passes
+        # that run before import_objects starts to remove items from self.json.
+        self.flat_items = get_flat_items(self.json)
 
         # Command-line arguments
         self.args = args
 
         self.ignore_missing = ignore_missing
 
+        # Types of objects imported since they were last fetched from ODB.
+        self.dirty_types = set()
+
+        # IDs, in the sense of id(), of items removed from the import list but still to be deleted from self.json.
+        self.removed_ids = set()
+
 # ################################################################################################################################
 
     def validate_service_required(self, item_type, item):
@@ -615,28 +774,27 @@ class ObjectImporter(object):
         from future.utils import iteritems
 
         service_info = SERVICE_BY_NAME[item_type]
-        item_dict = dict(item)
 
         for dep_field, dep_info in iteritems(service_info.service_dependencies):
             if not test_item(item, dep_info.get('condition')):
                 continue
 
             service_name = item.get(dep_field)
-            raw = (service_name, item_dict, item_type)
             if not service_name:
+                item_dict = dict(item)
+                raw = (service_name, item_dict, item_type)
                 self.results.add_error(raw, ERROR_SERVICE_NAME_MISSING, "No {} service key defined type {}: {}", dep_field, item_type, item_dict)
             elif service_name not in self.object_mgr.services:
+                item_dict = dict(item)
+                raw = (service_name, item_dict, item_type)
                 self.results.add_error(raw, ERROR_SERVICE_MISSING, "Service '{}' from '{}' missing in ODB ({})", service_name, item_dict, item_type)
 
 # ################################################################################################################################
 
     def validate_import_data(self):
 
-        # Python 2/3 compatibility
-        from future.utils import iteritems
-
         results = Results()
-        dep_scanner = DependencyScanner(self.json, ignore_missing=self.ignore_missing)
+        dep_scanner = DependencyScanner(self.json, ignore_missing=self.ignore_missing, flat_items=self.flat_items)
         scan_results = dep_scanner.scan()
 
         if not scan_results.ok:
@@ -649,22 +807,34 @@ class ObjectImporter(object):
                 results.add_warning(raw, WARNING_MISSING_DEF_INCL_ODB, "Definition '{}' not found in JSON/ODB ({}), needed by '{}'",
                                     missing_name, missing_type, dep_names)
 
-        for item_type, items in iteritems(self.json):
-            for item in items:
-                self.validate_service_required(item_type, item)
+        for item_type, item in self.flat_items:
+            self.validate_service_required(item_type, item)
 
         return results
 
 # ################################################################################################################################
 
     def remove_from_import_list(self, item_type, name):
-        lst = self.json.get(item_type, [])
-        item = find_first(lst, lambda item: item.name == name)
-        if item:
-            lst.remove(item)
+        items = self.json_by_name.get((item_type, name))
+        if items:
+            self.removed_ids.add(id(items.pop(0)))
         else:
             raise KeyError('Tried to remove missing %r named %r' % (item_type, name))
 
+# ################################################################################################################################
+
+    def purge_removed(self):
+        """ Delete from self.json all the items passed to remove_from_import_list so far, using one pass per type.
+        """
+
+        # Python 2/3 compatibility
+        from future.utils import itervalues
+
+        if self.removed_ids:
+            for items in itervalues(self.json):
+                items[:] = [item for item in items if id(item) not in self.removed_ids]
+            self.removed_ids.clear()
+
 # ################################################################################################################################
 
     def should_skip_item(self, item_type, attrs, is_edit):
@@ -698,8 +868,9 @@ class ObjectImporter(object):
 
 # ################################################################################################################################
 
-    def _import(self, item_type, attrs, is_edit):
-
+    def _get_attrs_dict(self, item_type, attrs, is_edit):
+        """ Return a copy of attrs for use in error messages, without the IDs that are not imported for a given type.
+        """
         attrs_dict = dict(attrs)
 
         # Generic connections cannot import their IDs during edits
@@ -721,9 +892,22 @@ class ObjectImporter(object):
             attrs_dict.pop('id', None)
             attrs_dict.pop('parent_id', None)
 
-        attrs.cluster_id = self.client.cluster_id
+        return attrs_dict
+
+# ################################################################################################################################
+
+    def _import(self, item_type, attrs, is_edit):
+
+        # This is what will be sent to the server, attrs are left as they were read from input
+        payload = dict(attrs)
+        payload['cluster_id'] = self.client.cluster_id
+
+        response = self._import_object(item_type, payload, is_edit)
+
+        # A dependency was missing and the error has been already recorded
+        if response is None:
+            return self.results
 
-        response = self._import_object(item_type, attrs, is_edit)
         if response.ok:
             if not (item_type == 'rbac_role_permission' and is_edit):
                 object_id = response.data['id']
@@ -731,6 +915,7 @@ class ObjectImporter(object):
 
         # We quit on first error encountered
         if response and not response.ok:
+            attrs_dict = self._get_attrs_dict(item_type, attrs, is_edit)
             raw = (item_type, attrs_dict, response.details)
             self.results.add_error(raw, ERROR_COULD_NOT_IMPORT_OBJECT,
                 "Could not import (is_edit {}) '{}' with '{}', response from '{}' was '{}'",
@@ -744,11 +929,27 @@ class ObjectImporter(object):
 
         # If this is a generic connection and it has a secret set (e.g. MongoDB password),
         # we need to explicitly set it for the connection we are editing.
-        if is_edit and item_type == 'zato_generic_connection' and attrs_dict.get('secret'):
-            self._set_generic_connection_secret(attrs_dict['name'], attrs_dict['type_'], attrs_dict['secret'])
+        if is_edit and item_type == 'zato_generic_connection' and attrs.get('secret'):
+            self._set_generic_connection_secret(attrs.name, attrs.type_, attrs.secret)
+
+        # Objects of this type will be fetched from ODB again only when they are needed, rather than after each import.
+        self.dirty_types.add(item_type)
+
+# ################################################################################################################################
 
-        # We'll see how expensive this call is. Seems to be but let's see in practice if it's a burden.
-        self.object_mgr.get_objects_by_type(item_type)
+    def refresh_dirty_types(self, item_types=None):
+        """ Fetch from ODB again objects of all types imported since their last refresh or, if `item_types` is given,
+        only of the types listed in it.
+        """
+        if item_types is None:
+            dirty = set(self.dirty_types)
+        else:
+            dirty = self.dirty_types.intersection(item_types)
+
+        for item_type in sorted(dirty):
+            self.object_mgr.get_objects_by_type(item_type)
+
+        self.dirty_types.difference_update(dirty)
 
 # ################################################################################################################################
 
@@ -761,31 +962,21 @@ class ObjectImporter(object):
 
     def find_already_existing_odb_objects(self):
 
-        # Python 2/3 compatibility
-        from future.utils import iteritems
-
         results = Results()
-        for item_type, items in iteritems(self.json):
-            for item in items:
-                name = item.get('name')
-                if not name:
-                    raw = (item_type, item)
-                    results.add_error(raw, ERROR_KEYS_MISSING, '{} has no `name` key ({})', dict(item), item_type)
-
-                if item_type == 'http_soap':
-                    connection = item.get('connection')
-                    transport = item.get('transport')
-
-                    item = find_first(self.object_mgr.objects.http_soap,
-                        lambda item: connection == item.connection and
-                                     transport == item.transport and
-                                     name == item.name)
-                    if item is not None:
-                        self.add_warning(results, item_type, item, item)
-                else:
-                    existing = self.object_mgr.find(item_type, {'name': name})
-                    if existing is not None:
-                        self.add_warning(results, item_type, item, existing)
+        for item_type, item in self.flat_items:
+            name = item.get('name')
+            if not name:
+                raw = (item_type, item)
+                results.add_error(raw, ERROR_KEYS_MISSING, '{} has no `name` key ({})', dict(item), item_type)
+
+            if item_type == 'http_soap':
+                lookup_config = {'name': name, 'connection': item.get('connection'), 'transport': item.get('transport')}
+            else:
+                lookup_config = {'name': name}
+
+            existing = self.object_mgr.find(item_type, lookup_config)
+            if existing is not None:
+                self.add_warning(results, item_type, item, existing)
 
         return results
 
@@ -796,7 +987,8 @@ class ObjectImporter(object):
         a security definition may be potentially a dependency of channels or a web socket
         object may be a dependency of pub/sub endpoints.
         """
-        return SERVICE_BY_NAME[item_type].is_security or 'def' in item_type or item_type == 'web_socket'
+        service_info = SERVICE_BY_NAME[item_type]
+        return service_info.is_security or service_info.is_def or item_type == 'web_socket'
 
 # ################################################################################################################################
 
@@ -804,6 +996,7 @@ class ObjectImporter(object):
         # type: (Results)
 
         # stdlib
+        from itertools import chain
         from time import sleep
 
         # Python 2/3 compatibility
@@ -811,6 +1004,8 @@ class ObjectImporter(object):
 
         rbac_sleep = float(self.args.rbac_sleep)
 
+        # Each of the lists below contains (item_type, attrs) tuples
+
         existing_defs = []
         existing_rbac_role = []
         existing_rbac_role_permission = []
@@ -828,9 +1023,9 @@ class ObjectImporter(object):
         #
 
         for w in already_existing.warnings:
-            item_type, _ = w.value_raw
+            item_type, attrs = w.value_raw
 
-            if 'def' in item_type:
+            if SERVICE_BY_NAME[item_type].is_def:
                 existing = existing_defs
             elif item_type == 'rbac_role':
                 existing = existing_rbac_role
@@ -840,17 +1035,15 @@ class ObjectImporter(object):
                 existing = existing_rbac_client_role
             else:
                 existing = existing_other
-            existing.append(w)
+            existing.append((item_type, attrs))
 
         #
         # .. actually invoke the updates now ..
         #
-        existing_combined = existing_defs + existing_rbac_role + existing_rbac_role_permission + \
-            existing_rbac_client_role + existing_other
+        existing_combined = chain(existing_defs, existing_rbac_role, existing_rbac_role_permission,
+            existing_rbac_client_role, existing_other)
 
-        for w in existing_combined:
-
-            item_type, attrs = w.value_raw
+        for item_type, attrs in existing_combined:
 
             if self.should_skip_item(item_type, attrs, True):
                 continue
@@ -863,6 +1056,9 @@ class ObjectImporter(object):
             if results:
                 return results
 
+        self.refresh_dirty_types()
+        self.purge_removed()
+
         #
         # Create new objects, again, definitions come first ..
         #
@@ -878,27 +1074,27 @@ class ObjectImporter(object):
                     append_to = new_defs
             else:
                 append_to = new_other
-            append_to.append({item_type: items})
+            append_to.extend((item_type, attrs) for attrs in items)
 
         #
         # .. actually create the objects now.
         #
-        new_combined = new_defs + new_rbac_role + new_rbac_role_permission + new_rbac_client_role + new_other
+        new_combined = chain(new_defs, new_rbac_role, new_rbac_role_permission, new_rbac_client_role, new_other)
+
+        for item_type, attrs in new_combined:
 
-        for elem in new_combined:
-            for item_type, attr_list in iteritems(elem):
-                for attrs in attr_list:
+            if self.should_skip_item(item_type, attrs, False):
+                continue
 
-                    if self.should_skip_item(item_type, attrs, False):
-                        continue
+            results = self._import(item_type, attrs, False)
 
-                    results = self._import(item_type, attrs, False)
+            if 'rbac' in item_type:
+                sleep(rbac_sleep)
 
-                    if 'rbac' in item_type:
-                        sleep(rbac_sleep)
+            if results:
+                return results
 
-                    if results:
-                        return results
+        self.refresh_dirty_types()
 
         return self.results
 
@@ -929,12 +1125,12 @@ class ObjectImporter(object):
 
         # Fetch an item from a cache of ODB object and assign its ID to item so that the Edit service knows what to update.
         if is_edit:
-            lookup_config = {'name': item.name}
+            lookup_config = {'name': item['name']}
             if def_type == 'http_soap':
-                lookup_config['connection'] = item.connection
-                lookup_config['transport'] = item.transport
+                lookup_config['connection'] = item['connection']
+                lookup_config['transport'] = item['transport']
             odb_item = self.object_mgr.find(def_type, lookup_config)
-            item.id = odb_item.id
+            item['id'] = odb_item.id
 
         for field_name, info in iteritems(service_info.object_dependencies):
 
@@ -942,10 +1138,26 @@ class ObjectImporter(object):
                 continue
 
             if item.get(field_name) != info.get('empty_value') and 'id_field' in info:
+
+                # The dependency may have been imported in a previous step, in which case we need to learn its ID first
+                if info['dependent_type'] == 'def_sec':
+                    self.refresh_dirty_types(SECURITY_SERVICE_NAMES)
+                else:
+                    self.refresh_dirty_types([info['dependent_type']])
+
                 dep_obj = self.object_mgr.find(info['dependent_type'], {
                     info['dependent_field']: item[field_name]
                 })
 
+                # Edits run before creates so an object being edited may point to a dependency
+                # that is in the input too but that has not been created yet.
+                if dep_obj is None:
+                    raw = (def_type, item['name'], field_name, info['dependent_type'], item[field_name])
+                    self.results.add_error(raw, ERROR_MISSING_DEP,
+                        "Could not import (is_edit {}) '{}' of type '{}', {} '{}' ({}) does not exist in ODB",
+                            is_edit, item['name'], def_type, field_name, item[field_name], info['dependent_type'])
+                    return
+
                 item[info['id_field']] = dep_obj.id
 
         self.logger.info('Invoking %s for %s', service_name, service_info.name)
@@ -953,7 +1165,7 @@ class ObjectImporter(object):
         response = self.client.invoke(service_name, item)
         if response.ok:
             verb = 'Updated' if is_edit else 'Created'
-            self.logger.info('%s object `%s` with %s', verb, item.name, service_name)
+            self.logger.info('%s object `%s` with %s', verb, item['name'], service_name)
 
         return response
 
@@ -976,7 +1188,7 @@ class ObjectImporter(object):
         })
 
         if response.ok:
-            self.logger.info("Updated password for '{}' ({})".format(attrs.name, service_name))
+            self.logger.info("Updated password for '%s' (%s)", attrs.name, service_name)
 
             # Wait for a moment before continuing to let AMQP connectors change their passwords.
             # This is needed because we may want to create channels right after the password
@@ -992,28 +1204,41 @@ class ObjectManager(object):
         self.client = client # type: APIClient
         self.logger = logger # type: Logger
 
+        #: (item_type, fields) -> {values: item}, built on demand by find and reset each time objects are fetched
+        self.index = {}
+
 # ################################################################################################################################
 
-    def find(self, item_type, fields):
+    def get_index(self, item_type, fields):
+        """ Return a dictionary mapping tuples with values of all the `fields` to objects of `item_type`,
+        building it if needed. If more than one object has the same values, the first one is used, as in a linear search.
+        """
+        key = (item_type, fields)
+        index = self.index.get(key)
 
-        if item_type == 'def_sec':
-            return self.find_sec(fields)
+        if index is None:
+            index = self.index[key] = {}
 
-        # This probably isn't necessary any more:
-        item_type = item_type.replace('-', '_')
-        objects_by_type = self.objects.get(item_type, ())
-        return find_first(objects_by_type, lambda item: dict_match(item, fields))
+            if item_type == 'def_sec':
+                item_types = [service.name for service in SECURITY_SERVICES]
+            else:
+                item_types = [item_type]
+
+            for name in item_types:
+                for item in self.objects.get(name, ()):
+                    index.setdefault(tuple(item.get(field) for field in fields), item)
+
+        return index
 
 # ################################################################################################################################
 
-    def find_sec(self, fields):
-        """ Find any security definition with the given name.
-        """
-        for service in SERVICES:
-            if service.is_security:
-                item = self.find(service.name, fields)
-                if item is not None:
-                    return item
+    def find(self, item_type, fields):
+
+        # This probably isn't necessary any more:
+        item_type = item_type.replace('-', '_')
+
+        names = tuple(sorted(fields))
+        return self.get_index(item_type, names).get(tuple(fields[name] for name in names))
 
 # ################################################################################################################################
 
@@ -1124,7 +1349,7 @@ class ObjectManager(object):
 
         service_name = service_info.get_service_name('delete')
         if service_name is None:
-            self.logger.error('Prefix {} has no delete service'.format(item_type))
+            self.logger.error('Prefix %s has no delete service', item_type)
             return
 
         response = self.client.invoke(service_name, {
@@ -1132,9 +1357,9 @@ class ObjectManager(object):
             'id': item.id,
         })
         if response.ok:
-            self.logger.info("Deleted {} ID {}".format(item_type, item.id))
+            self.logger.info('Deleted %s ID %s', item_type, item.id)
         else:
-            self.logger.error("Could not delete {} ID {}: {}".format(item_type, item.id, response))
+            self.logger.error('Could not delete %s ID %s: %s', item_type, item.id, response)
 
 # ################################################################################################################################
 
@@ -1154,6 +1379,19 @@ class ObjectManager(object):
 
     def get_objects_by_type(self, item_type):
 
+        items = self._get_objects_by_type(item_type)
+
+        if items is not None:
+            self.objects[item_type] = items
+            self.index.clear()
+
+# ################################################################################################################################
+
+    def _get_objects_by_type(self, item_type):
+        """ Returns a list of objects of a given type as they exist on the server or None if they could not be fetched.
+        Does not modify self.objects so that it can be run from multiple threads concurrently.
+        """
+
         # Bunch
         from bunch import Bunch
 
@@ -1179,10 +1417,10 @@ class ObjectManager(object):
         })
 
         if not response.ok:
-            self.logger.warning('Could not fetch objects of type {}: {}'.format(service_info.name, response.details))
+            self.logger.warning('Could not fetch objects of type %s: %s', service_info.name, response.details)
             return
 
-        self.objects[service_info.name] = []
+        items = []
 
         # Generic connections' GetList includes metadata in responses so we need to dig into actual data
         if '_meta' in response.data:
@@ -1190,9 +1428,12 @@ class ObjectManager(object):
         else:
             data = response.data
 
+        # Most types have no export filter at all, in which case it is not checked for each item
+        export_filter = tuple(iteritems(service_info.export_filter))
+
         for item in map(Bunch, data):
 
-            if any(getattr(item, key, None) == value for key, value in iteritems(service_info.export_filter)):
+            if export_filter and any(item.get(key) == value for key, value in export_filter):
                 continue
 
             if self.is_ignored_name(item_type, item):
@@ -1204,12 +1445,17 @@ class ObjectManager(object):
                     if value.startswith(SECRETS.PREFIX):
                         item[key] = None # Enmasse does not export secrets such as passwords or other auth information
 
-            self.objects[service_info.name].append(item)
+            items.append(item)
+
+        return items
 
 # ################################################################################################################################
 
     def _refresh_objects(self):
 
+        # stdlib
+        from concurrent.futures import ThreadPoolExecutor
+
         # Bunch
         from bunch import Bunch
 
@@ -1217,8 +1463,16 @@ class ObjectManager(object):
         from future.utils import iteritems
 
         self.objects = Bunch()
-        for service_info in SERVICES:
-            self.get_objects_by_type(service_info.name)
+        self.index.clear()
+
+        item_types = [service_info.name for service_info in SERVICES]
+
+        # Each get-list call is an independent round-trip to the server so several of them can be in flight at once.
+        # Results are still assigned here, in the order of SERVICES, rather than from the worker threads.
+        with ThreadPoolExecutor(max_workers=max(1, min(REFRESH_MAX_WORKERS, len(item_types)))) as executor:
+            for item_type, items in zip(item_types, executor.map(self._get_objects_by_type, item_types)):
+                if items is not None:
+                    self.objects[item_type] = items
 
         for item_type, items in iteritems(self.objects):
             for item in items:
@@ -1229,33 +1483,47 @@ class JsonCodec(object):
 
 # ################################################################################################################################
 
-    def load(self, file_, results):
+    def load(self, data, results):
 
         # Zato
         from zato.common.json_internal import loads
 
-        return loads(file_.read())
+        return loads(data)
 
 # ################################################################################################################################
 
     def dump(self, file_, object_):
 
         # Zato
-        from zato.common.json_internal import dumps
+        from zato.common.json_internal import dump
 
-        file_.write(dumps(object_, indent=1, sort_keys=True))
+        dump(object_, file_, indent=1, sort_keys=True)
 
 class YamlCodec(object):
     extension = '.yml'
 
+    # Set once the Bunch representer below is registered with pyaml, which is process-wide
+    has_bunch_representer = False
+
 # ################################################################################################################################
 
-    def load(self, file_, results):
+    def load(self, data, results):
 
         # yaml
         import yaml
 
-        return yaml.load(file_, yaml.FullLoader)
+        # Use libyaml if it is available, falling back to the pure-Python loader otherwise
+        try:
+            from yaml import CSafeLoader as SafeLoader
+        except ImportError:
+            from yaml import SafeLoader
+
+        # Errors such as invalid UTF-8 in the input are raised by yaml as YAMLError rather than UnicodeDecodeError,
+        # so they are turned into ValueError for _parse_file to report them like other parsing errors.
+        try:
+            return yaml.load(data, SafeLoader)
+        except yaml.YAMLError as e:
+            raise ValueError(e)
 
 # ################################################################################################################################
 
@@ -1264,6 +1532,16 @@ class YamlCodec(object):
         # pyaml
         import pyaml
 
+        # Represent Bunch instances as regular dicts, otherwise pyaml's default, unsafe, dumper
+        # would write them out as !!python/object:bunch.Bunch
+        if not YamlCodec.has_bunch_representer:
+
+            # Bunch
+            from bunch import Bunch
+
+            pyaml.add_representer(Bunch, pyaml.PrettyYAMLDumper.represent_dict)
+            YamlCodec.has_bunch_representer = True
+
         file_.write(pyaml.dump(object_, vspacing=True))
 
 class InputParser(object):
@@ -1277,12 +1555,17 @@ class InputParser(object):
         self.codec = codec
         self.seen_includes = set()
 
+        # Includes are relative to the directory of the main input file, which is already absolute
+        self.curdir = os.path.dirname(self.path)
+
 # ################################################################################################################################
 
     def _parse_file(self, path, results):
         try:
-            with open(path) as fp:
-                return self.codec.load(fp, results)
+            # Codecs take raw bytes and decode them themselves
+            with open(path, 'rb') as fp:
+                data = fp.read()
+            return self.codec.load(data, results)
         except (IOError, TypeError, ValueError) as e:
             raw = (path, e)
             results.add_error(raw, ERROR_INVALID_INPUT, 'Failed to parse {}: {}', path, e)
@@ -1295,9 +1578,8 @@ class InputParser(object):
         # stdlib
         import os
 
-        curdir = os.path.dirname(self.path)
-        joined = os.path.join(curdir, include_path.replace('file://', ''))
-        return os.path.abspath(joined)
+        joined = os.path.join(self.curdir, include_path.replace('file://', ''))
+        return os.path.normpath(joined)
 
 # ################################################################################################################################
 
@@ -1315,6 +1597,10 @@ class InputParser(object):
         if abs_path in self.seen_includes:
             raw = (abs_path,)
             results.add_error(raw, ERROR_ITEM_INCLUDED_MULTIPLE_TIMES, '{} included repeatedly', abs_path)
+
+            # The file was already parsed and its items added once, there is no point in reading it again
+            return
+
         self.seen_includes.add(abs_path)
 
         obj = self._parse_file(abs_path, results)
@@ -1350,8 +1636,8 @@ class InputParser(object):
                               item)
             return
 
-        service_names = [si.name for si in SERVICES if si.is_security]
-        if sec_type not in service_names:
+        if sec_type not in SECURITY_SERVICE_NAMES:
+            service_names = [si.name for si in SECURITY_SERVICES]
             raw = (sec_type, service_names, item)
             results.add_error(raw, ERROR_INVALID_SEC_DEF_TYPE,
                 "Invalid type '{}', must be one of '{}' (def_sec)", sec_type, service_names)
@@ -1361,28 +1647,51 @@ class InputParser(object):
 
 # ################################################################################################################################
 
-    def parse_item(self, item_type, item, results):
-
+    def _append_item(self, item_type, item, results):
         # Bunch
         from bunch import Bunch
 
-        if self.is_include(item):
-            self.load_include(item_type, item, results)
-        elif item_type == 'def_sec':
-            self.parse_def_sec(item, results)
-        else:
-            self.json.setdefault(item_type, []).append(Bunch(item))
+        self.json.setdefault(item_type, []).append(Bunch(item))
 
 # ################################################################################################################################
 
-    def _maybe_fixup_http_soap(self, original_item_type, item):
+    def _parse_def_sec_item(self, item_type, item, results):
+        self.parse_def_sec(item, results)
+
+# ################################################################################################################################
+
+    def resolve_item_type(self, item_type):
+        """ Returns a (target_type, connection_transport, handler) tuple for dict items of `item_type` as given in the input.
+        Items are stored under target_type, old-format http-soap items are given connection and transport
+        from connection_transport (None for other types) and handler adds them to self.json.
+        """
         # Preserve old format by merging http-soap subtypes into one.
-        for item_type, connection, transport in HTTP_SOAP_KINDS:
-            if item_type == original_item_type:
-                item['connection'] = connection
-                item['transport'] = transport
-                return 'http_soap'
-        return original_item_type
+        connection_transport = HTTP_SOAP_CONNECTION_TRANSPORT.get(item_type)
+        target_type = 'http_soap' if connection_transport else item_type
+        handler = self._parse_def_sec_item if target_type == 'def_sec' else self._append_item
+
+        return target_type, connection_transport, handler
+
+# ################################################################################################################################
+
+    def parse_dict_item(self, target_type, connection_transport, handler, item, results):
+        """ Adds a single dict item to self.json using the output of resolve_item_type.
+        """
+        if connection_transport:
+            item['connection'], item['transport'] = connection_transport
+
+        normalize_service_name(item)
+        handler(target_type, item, results)
+
+# ################################################################################################################################
+
+    def parse_item(self, item_type, item, results):
+
+        if self.is_include(item):
+            self.load_include(item_type, item, results)
+        else:
+            target_type, connection_transport, handler = self.resolve_item_type(item_type)
+            self.parse_dict_item(target_type, connection_transport, handler, item, results)
 
 # ################################################################################################################################
 
@@ -1390,6 +1699,7 @@ class InputParser(object):
 
         # Python 2/3 compatibility
         from future.utils import iteritems
+        from past.builtins import basestring
 
         for item_type, items in iteritems(dict_):
             if item_type not in SERVICE_BY_NAME and item_type not in HTTP_SOAP_ITEM_TYPES:
@@ -1397,12 +1707,16 @@ class InputParser(object):
                 results.add_error(raw, ERROR_UNKNOWN_ELEM, "Ignoring unknown element type {} in the input.", item_type)
                 continue
 
+            # Resolved once for all the items of this type
+            target_type, connection_transport, handler = self.resolve_item_type(item_type)
+
             for item in items:
-                this_item_type = item_type
-                if isinstance(item, dict):
-                    this_item_type = self._maybe_fixup_http_soap(item_type, item)
-                    normalize_service_name(item)
-                self.parse_item(this_item_type, item, results)
+
+                # Includes are resolved using the item type as it was given in the input
+                if isinstance(item, basestring):
+                    self.load_include(item_type, item, results)
+                else:
+                    self.parse_dict_item(target_type, connection_transport, handler, item, results)
 
 # ################################################################################################################################
 
@@ -1451,7 +1765,7 @@ class Enmasse(ManageCommand):
         codec_class = self.CODEC_BY_EXTENSION.get(ext.lower())
         if codec_class is None:
             exts = ', '.join(sorted(self.CODEC_BY_EXTENSION))
-            self.logger.error('Unrecognized file extension "{}": must be one of {}'.format(ext.lower(), exts))
+            self.logger.error('Unrecognized file extension "%s": must be one of %s', ext.lower(), exts)
             sys.exit(self.SYS_ERROR.INVALID_INPUT)
 
         path = os.path.join(self.curdir, self.args.input)
@@ -1469,6 +1783,7 @@ class Enmasse(ManageCommand):
 
         # stdlib
         import os
+        from concurrent.futures import ThreadPoolExecutor
         from time import sleep
 
         # Bunch
@@ -1511,18 +1826,33 @@ class Enmasse(ManageCommand):
             sleep(initial_wait_time)
 
         self.object_mgr = ObjectManager(self.client, self.logger)
-        self.client.invoke('zato.ping')
-        populate_services_from_apispec(self.client, self.logger)
+
+        # The ping and the list of services are independent of each other so both requests can be in flight at once
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            ping_future = executor.submit(self.client.invoke, 'zato.ping')
+            apispec_future = executor.submit(populate_services_from_apispec, self.client, self.logger)
+            ping_future.result()
+            apispec_future.result()
 
         has_import = getattr(args, 'import')
         if True not in (args.export_local, args.export_odb, args.clean_odb, has_import):
             self.logger.error('At least one of --clean, --export-local, --export-odb or --import is required, stopping now')
             sys.exit(self.SYS_ERROR.NO_OPTIONS)
 
+        # Imports and export are mutually excluding
+        if has_import and (args.export_local or args.export_odb):
+            self.logger.error('Cannot specify import and export options at the same time, stopping now')
+            sys.exit(self.SYS_ERROR.CONFLICTING_OPTIONS)
+
+        # Parse and validate the input before anything is deleted from ODB or its configuration is checked
+        # so that an invalid input file stops us as early as possible.
+        if args.export_local or has_import:
+            self.load_input()
+
         if args.clean_odb:
             self.object_mgr.refresh()
             count = self.object_mgr.delete_all()
-            self.logger.info('Deleted {} items'.format(count))
+            self.logger.info('Deleted %s items', count)
 
         if args.export_odb or has_import:
             # Checks if connections to ODB/Redis are configured properly
@@ -1533,14 +1863,6 @@ class Enmasse(ManageCommand):
             # Get back to the directory we started in so following commands start afresh as well
             os.chdir(self.curdir)
 
-        # Imports and export are mutually excluding
-        if has_import and (args.export_local or args.export_odb):
-            self.logger.error('Cannot specify import and export options at the same time, stopping now')
-            sys.exit(self.SYS_ERROR.CONFLICTING_OPTIONS)
-
-        if args.export_local or has_import:
-            self.load_input()
-
         # 3)
         if args.export_local and args.export_odb:
             self.report_warnings_errors(self.export_local_odb())
@@ -1568,15 +1890,14 @@ class Enmasse(ManageCommand):
         import os
         import re
         from datetime import datetime
-
-        # Bunch
-        from zato.bunch import debunchify
+        from operator import itemgetter
 
         # Python 2/3 compatibility
-        from future.utils import iteritems
+        from future.utils import iteritems, itervalues
 
-        # Make a copy and remove Bunch; pyaml does not like Bunch instances.
-        output = debunchify(self.json)
+        # Only the top-level dict and its lists are rearranged below so there is no need to copy the items themselves.
+        # Codecs can serialize Bunch instances directly.
+        output = {item_type: list(items) for item_type, items in iteritems(self.json)}
 
         # Preserve old format by splitting out particular types of http-soap.
         for item in output.pop('http_soap', []):
@@ -1586,41 +1907,41 @@ class Enmasse(ManageCommand):
 
         # Preserve old format by wrapping security services into one key.
         output['def_sec'] = []
-        for service_info in SERVICES:
-            if service_info.is_security:
-                output['def_sec'].extend(
-                    dict(item, type=service_info.name)
-                    for item in output.pop(service_info.name, [])
-                )
+        for service_info in SECURITY_SERVICES:
+            output['def_sec'].extend(
+                dict(item, type=service_info.name)
+                for item in output.pop(service_info.name, [])
+            )
 
-        for _, items in iteritems(output):
-            for item in items:
-                normalize_service_name(item)
+        # Items were already normalized with normalize_service_name, either when the input was parsed
+        # or, for ODB objects, in ObjectManager.fix_up_odb_object.
 
-            # Sort item lists by ID.
-            items.sort(key=lambda item: item['id'])
+        # Sort item lists by ID.
+        by_id = itemgetter('id')
+        for items in itervalues(output):
+            items.sort(key=by_id)
 
         now = datetime.now().isoformat() # Not in UTC, we want to use user's TZ
         name = 'zato-export-{}{}'.format(re.sub('[.:]', '_', now), self.codec.extension)
         with open(os.path.join(self.curdir, name), 'w') as fp:
             self.codec.dump(fp, output)
-        self.logger.info('Data exported to {}'.format(fp.name))
+        self.logger.info('Data exported to %s', fp.name)
 
 # ################################################################################################################################
 
     def get_warnings_errors(self, items):
         warn_idx = 1
         error_idx = 1
-        warn_err = {}
+        warn_err = [] # A list of (key, value) rows for get_table
 
         for item in items:
 
             for warning in item.warnings:
-                warn_err['warn{:04}/{} {}'.format(warn_idx, warning.code.symbol, warning.code.desc)] = warning.value
+                warn_err.append(('warn{:04}/{} {}'.format(warn_idx, warning.code.symbol, warning.code.desc), warning.value))
                 warn_idx += 1
 
             for error in item.errors:
-                warn_err['err{:04}/{} {}'.format(error_idx, error.code.symbol, error.code.desc)] = error.value
+                warn_err.append(('err{:04}/{} {}'.format(error_idx, error.code.symbol, error.code.desc), error.value))
                 error_idx += 1
 
         warn_no = warn_idx-1
@@ -1661,9 +1982,6 @@ class Enmasse(ManageCommand):
         # texttable
         import texttable
 
-        # Python 2/3 compatibility
-        from future.utils import iteritems
-
         cols_width = self.args.cols_width if self.args.cols_width else DEFAULT_COLS_WIDTH
         cols_width = (elem.strip() for elem in cols_width.split(','))
         cols_width = [int(elem) for elem in cols_width]
@@ -1675,7 +1993,7 @@ class Enmasse(ManageCommand):
         table.set_cols_dtype(['t', 't'])
 
         rows = [['Key', 'Value']]
-        rows.extend(sorted(iteritems(out)))
+        rows.extend(sorted(out))
 
         table.add_rows(rows)
 
@@ -1685,41 +2003,71 @@ class Enmasse(ManageCommand):
 
     def merge_odb_json(self):
 
-        # stdlib
-        import copy
+        # Bunch
+        from bunch import Bunch
 
         # Python 2/3 compatibility
         from future.utils import iteritems
 
         results = Results()
-        merged = copy.deepcopy(self.object_mgr.objects)
+
+        # Only the lists are modified below, never the objects in them, so there is no need for a deep copy
+        merged = Bunch((key, list(items)) for key, items in iteritems(self.object_mgr.objects))
+
+        # ODB objects are looked up through object_mgr's indexes, by (connection, name, transport) for http_soap
+        # and by name for other types. Input items added so far are kept in the same form in added_by_odb_key
+        # so that a later item replaces an earlier one of the same name too. Replaced objects are collected by identity
+        # and filtered out in one pass at the end.
+        added_by_odb_key = {}
+        replaced = set()
 
         for json_key, json_elems in iteritems(self.json):
-            if 'http' in json_key or 'soap' in json_key:
+            is_http_soap = json_key in HTTP_SOAP_KEYS
+
+            if is_http_soap:
                 odb_key = 'http_soap'
+                fields = ('connection', 'name', 'transport')
+
+                # Items from InputParser are already merged into http_soap and carry their own connection and transport
+                if json_key == 'http_soap':
+                    connection, transport = None, None
+                else:
+                    connection, transport = json_key.split('_', 1)
+                    connection = 'outgoing' if connection == 'outconn' else connection
             else:
                 odb_key = json_key
+                fields = ('name',)
 
             if odb_key not in merged:
                 sorted_merged = sorted(merged)
                 raw = (json_key, odb_key, sorted_merged)
                 results.add_error(raw, ERROR_INVALID_KEY, "JSON key '{}' not one of '{}'", odb_key, sorted_merged)
             else:
+                odb_index = self.object_mgr.get_index(odb_key, fields)
+                added = added_by_odb_key.setdefault(odb_key, {})
+
                 for json_elem in json_elems:
-                    if 'http' in json_key or 'soap' in json_key:
-                        connection, transport = json_key.split('_', 1)
-                        connection = 'outgoing' if connection == 'outconn' else connection
-
-                        for odb_elem in merged.http_soap:
-                            if odb_elem.get('transport') == transport and odb_elem.get('connection') == connection:
-                                if odb_elem.name == json_elem.name:
-                                    merged.http_soap.remove(odb_elem)
+                    if is_http_soap:
+                        if connection is None:
+                            key = (json_elem.get('connection'), json_elem.name, json_elem.get('transport'))
+                        else:
+                            key = (connection, json_elem.name, transport)
                     else:
-                        for odb_elem in merged[odb_key]:
-                            if odb_elem.name == json_elem.name:
-                                merged[odb_key].remove(odb_elem)
+                        key = (json_elem.name,)
+
+                    previous = added.get(key)
+                    if previous is None:
+                        previous = odb_index.get(key)
+                    if previous is not None:
+                        replaced.add(id(previous))
+
+                    added[key] = json_elem
                     merged[odb_key].append(json_elem)
 
+        if replaced:
+            for odb_key in added_by_odb_key:
+                merged[odb_key] = [elem for elem in merged[odb_key] if id(elem) not in replaced]
+
         if results.ok:
             self.json = merged
         return results
@@ -1727,15 +2075,19 @@ class Enmasse(ManageCommand):
 # ################################################################################################################################
 
     def export(self):
+
+        # Both passes below walk the same items
+        flat_items = get_flat_items(self.json)
+
         # Find any definitions that are missing
-        dep_scanner = DependencyScanner(self.json, ignore_missing=self.args.ignore_missing_defs)
+        dep_scanner = DependencyScanner(self.json, ignore_missing=self.args.ignore_missing_defs, flat_items=flat_items)
         missing_defs = dep_scanner.scan()
         if not missing_defs.ok:
             self.logger.error('Failed to find all definitions needed')
             return [missing_defs]
 
         # Validate if every required input element has been specified.
-        results = InputValidator(self.json).validate()
+        results = InputValidator(self.json, flat_items).validate()
         if not results.ok:
             self.logger.error('Required elements missing')
             return [results]
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+"""
+Copyright (C) Zato Source s.r.o. https://zato.io
+
+Licensed under LGPLv3, see LICENSE.txt for terms and conditions.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+# stdlib
+import logging
+import os
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+
+# Zato
+from zato.cli.enmasse import ERROR_INVALID_INPUT, InputParser, JsonCodec, YamlCodec
+
+# ################################################################################################################################
+
+logger = logging.getLogger(__name__)
+
+# ################################################################################################################################
+
+class InputParserTestCase(TestCase):
+
+    def setUp(self):
+        self.dir_name = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.dir_name)
+
+# ################################################################################################################################
+
+    def _parse(self, file_name, data, codec):
+
+        path = os.path.join(self.dir_name, file_name)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+        return InputParser(path, logger, codec).parse()
+
+# ################################################################################################################################
+
+    def test_parse_yaml_invalid_utf8(self):
+
+        # 0xe9 is 'é' in latin-1 and not valid UTF-8 on its own
+        results = self._parse('input.yml', b'def_amqp: [{name: "caf\xe9"}]\n', YamlCodec())
+
+        self.assertFalse(results.ok)
+        self.assertEqual(len(results.errors), 1)
+        self.assertIs(results.errors[0].code, ERROR_INVALID_INPUT)
+
+# ################################################################################################################################
+
+    def test_parse_yaml_invalid_syntax(self):
+
+        results = self._parse('input.yml', b'def_amqp: [{name: abc}\n', YamlCodec())
+
+        self.assertFalse(results.ok)
+        self.assertEqual(len(results.errors), 1)
+        self.assertIs(results.errors[0].code, ERROR_INVALID_INPUT)
+
+# ################################################################################################################################
+
+    def test_parse_json_invalid_utf8(self):
+
+        results = self._parse('input.json', b'{"def_amqp": [{"name": "caf\xe9"}]}', JsonCodec())
+
+        self.assertFalse(results.ok)
+        self.assertEqual(len(results.errors), 1)
+        self.assertIs(results.errors[0].code, ERROR_INVALID_INPUT)
+
+# ################################################################################################################################
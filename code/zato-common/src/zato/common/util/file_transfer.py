@@ -13,7 +13,8 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 def parse_extra_into_list(data):
     # type: (str) -> list
-    return [int(elem.strip()) for elem in data.split(';') if elem]
+    # int() ignores surrounding whitespace on its own so there is no need to strip each element first
+    return list(map(int, filter(None, data.split(';'))))
 
 # ################################################################################################################################
 # ################################################################################################################################